@@ -71,16 +71,47 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def do_run_migrations(connection) -> None:
+    """
+    Configure the Alembic context on an open connection and run migrations in a transaction.
+
+    If a PG_SCHEMA value is available from the application's config and is not "public",
+    the schema is used for the Alembic version table via `version_table_schema`.
+    """
+    # Set up schema context if we have one
+    context_args = {"connection": connection, "target_metadata": target_metadata}
+
+    # Add schema context if it's not the default public schema
+    try:
+        from config import PG_SCHEMA
+
+        if PG_SCHEMA and PG_SCHEMA != "public":
+            context_args["version_table_schema"] = PG_SCHEMA
+    except ImportError:
+        pass
+
+    context.configure(**context_args)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
 def run_migrations_online() -> None:
     """
     Run database migrations in "online" mode using a live DB connection.
     
-    Creates an Engine from the alembic config (section prefixed with "sqlalchemy.", using a NullPool),
-    opens a connection, configures the Alembic context with that connection and the module's
-    target_metadata, and executes migrations inside a transaction. If a PG_SCHEMA value is
-    available from the application's config and is not "public", the schema is used for the
-    Alembic version table via `version_table_schema`.
+    If the caller placed an open connection in ``config.attributes["connection"]`` (e.g. a
+    test fixture or script running several Alembic commands in a row), migrations run on
+    that connection so no new connect/auth handshake is paid per command. Otherwise an
+    Engine is created from the alembic config (section prefixed with "sqlalchemy.", using
+    a NullPool since a one-shot CLI run needs a single connection) and a connection is
+    opened for the duration of the run.
     """
+    connection = config.attributes.get("connection", None)
+    if connection is not None:
+        do_run_migrations(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -88,22 +119,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        # Set up schema context if we have one
-        context_args = {"connection": connection, "target_metadata": target_metadata}
-
-        # Add schema context if it's not the default public schema
-        try:
-            from config import PG_SCHEMA
-
-            if PG_SCHEMA and PG_SCHEMA != "public":
-                context_args["version_table_schema"] = PG_SCHEMA
-        except ImportError:
-            pass
-
-        context.configure(**context_args)
-
-        with context.begin_transaction():
-            context.run_migrations()
+        do_run_migrations(connection)
 
 
 if context.is_offline_mode():
@@ -15,7 +15,6 @@ import sys
 
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy import text
 
 # Add project root to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -32,6 +31,52 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def _rename_columns(conn, discovery_sql):
+    """
+    Rename the columns listed by `discovery_sql` and report what was renamed.
+
+    `discovery_sql` must select (table_name, old_column, new_column) rows. They are
+    staged in a temp table (dropped on commit), a server-side DO block renames
+    each one, and the staged rows are read back for logging. All of it is sent as
+    a single batch straight to the driver, so the migration is one round-trip
+    regardless of table count (pyformat params, so literal % is doubled).
+    """
+    result = conn.exec_driver_sql(
+        f"""
+        DROP TABLE IF EXISTS pg_temp._column_renames;
+        CREATE TEMP TABLE _column_renames (
+            table_name TEXT NOT NULL,
+            old_column TEXT NOT NULL,
+            new_column TEXT NOT NULL
+        ) ON COMMIT DROP;
+
+        INSERT INTO _column_renames (table_name, old_column, new_column)
+        {discovery_sql};
+
+        DO $$
+        DECLARE
+            r record;
+        BEGIN
+            FOR r IN SELECT * FROM _column_renames LOOP
+                EXECUTE format(
+                    'ALTER TABLE %%I.%%I RENAME COLUMN %%I TO %%I',
+                    %(schema)s, r.table_name, r.old_column, r.new_column
+                );
+            END LOOP;
+        END $$;
+
+        SELECT table_name, old_column, new_column
+        FROM _column_renames
+        ORDER BY table_name;
+    """,
+        {"schema": PG_SCHEMA},
+    )
+    renamed = result.fetchall()
+    for table_name, old_column, new_column in renamed:
+        print(f"Renamed {old_column} to {new_column} in table {table_name}")
+    print(f"Renamed columns in {len(renamed)} tables")
+
+
 def upgrade() -> None:
     """
     Rename dynamic tables' 'text_content' columns to '{table_name}_value'.
@@ -40,90 +85,63 @@ def upgrade() -> None:
     'text_content' (excluding tables named 'SchemaVersions', 'XMLFilesProcessed'
     and any table with a name starting with 'pg_'), and for each match issues an
     ALTER TABLE ... RENAME COLUMN statement to rename 'text_content' to
-    '{table_name}_value'. Prints progress to stdout and performs changes via raw
-    SQL executed on the migration connection.
+    '{table_name}_value'. Discovery reads pg_class/pg_attribute directly rather
+    than the much slower information_schema views, and discovery plus renames
+    are sent as one batch (see _rename_columns). Everything runs inside Alembic's
+    migration transaction, so a failure part way through leaves every column
+    untouched.
     """
     # Get database connection
     conn = op.get_bind()
 
-    # Find all tables in our schema that have a 'text_content' column
-    # but exclude system tables
-    query = text(
-        """
-        SELECT t.table_name 
-        FROM information_schema.tables t
-        INNER JOIN information_schema.columns c 
-            ON t.table_name = c.table_name 
-            AND t.table_schema = c.table_schema
-        WHERE t.table_schema = :schema
-            AND t.table_type = 'BASE TABLE'
-            AND c.column_name = 'text_content'
-            AND t.table_name NOT IN ('SchemaVersions', 'XMLFilesProcessed')
-            AND t.table_name NOT LIKE 'pg_%'
-    """
-    )
-
-    result = conn.execute(query, {"schema": PG_SCHEMA})
-    tables_with_text_content = [row[0] for row in result]
+    print(f"Renaming text_content columns to {{table_name}}_value in schema {PG_SCHEMA}")
 
-    print(f"Found {len(tables_with_text_content)} tables with text_content column")
-
-    # For each table, rename text_content to {table_name}_value
-    for table_name in tables_with_text_content:
-        new_column_name = f"{table_name}_value"
-        print(f"Renaming text_content to {new_column_name} in table {table_name}")
-
-        # Use raw SQL for the rename operation
-        rename_sql = text(
-            f"""
-            ALTER TABLE "{PG_SCHEMA}"."{table_name}" 
-            RENAME COLUMN "text_content" TO "{new_column_name}"
+    # Every table in our schema that has a 'text_content' column, excluding
+    # system tables
+    _rename_columns(
+        conn,
         """
-        )
-        conn.execute(rename_sql)
+        SELECT c.relname, a.attname, c.relname || '_value'
+        FROM pg_catalog.pg_class c
+        INNER JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+        WHERE c.relnamespace = (
+                SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %(schema)s
+            )
+            AND c.relkind = 'r'
+            AND a.attname = 'text_content'
+            AND NOT a.attisdropped
+            AND c.relname NOT IN ('SchemaVersions', 'XMLFilesProcessed')
+            AND c.relname NOT LIKE 'pg\\_%%'
+        """,
+    )
 
 
 def downgrade() -> None:
     """
     Downgrade migration: rename dynamic "{table_name}_value" columns back to "text_content".
     
-    Finds all base tables in PG_SCHEMA whose column name equals "{table_name}_value" (excludes SchemaVersions, XMLFilesProcessed, and tables with names starting with "pg_") and executes ALTER TABLE ... RENAME COLUMN to revert each matching column to "text_content". Prints the number of affected tables and progress messages to stdout.
+    Finds all base tables in PG_SCHEMA (via pg_class/pg_attribute) whose column name equals "{table_name}_value" (excludes SchemaVersions, XMLFilesProcessed, and tables with names starting with "pg_") and executes ALTER TABLE ... RENAME COLUMN to revert each matching column to "text_content". Discovery and renames are sent as one batch (see _rename_columns).
     """
     # Get database connection
     conn = op.get_bind()
 
-    # Find all tables in our schema that have columns ending with '_value'
-    # but exclude system tables
-    query = text(
-        """
-        SELECT t.table_name, c.column_name
-        FROM information_schema.tables t
-        INNER JOIN information_schema.columns c 
-            ON t.table_name = c.table_name 
-            AND t.table_schema = c.table_schema
-        WHERE t.table_schema = :schema
-            AND t.table_type = 'BASE TABLE'
-            AND c.column_name LIKE '%_value'
-            AND t.table_name NOT IN ('SchemaVersions', 'XMLFilesProcessed')
-            AND t.table_name NOT LIKE 'pg_%'
-            AND c.column_name = t.table_name || '_value'  -- Only columns that match the pattern
-    """
-    )
-
-    result = conn.execute(query, {"schema": PG_SCHEMA})
-    table_column_pairs = [(row[0], row[1]) for row in result]
-
-    print(f"Found {len(table_column_pairs)} tables with dynamic value columns")
+    print(f"Renaming {{table_name}}_value columns back to text_content in schema {PG_SCHEMA}")
 
-    # For each table, rename {table_name}_value back to text_content
-    for table_name, column_name in table_column_pairs:
-        print(f"Renaming {column_name} back to text_content in table {table_name}")
-
-        # Use raw SQL for the rename operation
-        rename_sql = text(
-            f"""
-            ALTER TABLE "{PG_SCHEMA}"."{table_name}" 
-            RENAME COLUMN "{column_name}" TO "text_content"
+    # Every table in our schema whose '{table_name}_value' column matches the
+    # pattern, excluding system tables
+    _rename_columns(
+        conn,
         """
-        )
-        conn.execute(rename_sql)
+        SELECT c.relname, a.attname, 'text_content'
+        FROM pg_catalog.pg_class c
+        INNER JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+        WHERE c.relnamespace = (
+                SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %(schema)s
+            )
+            AND c.relkind = 'r'
+            AND NOT a.attisdropped
+            AND c.relname NOT IN ('SchemaVersions', 'XMLFilesProcessed')
+            AND c.relname NOT LIKE 'pg\\_%%'
+            AND a.attname = c.relname || '_value'  -- Only columns that match the pattern
+        """,
+    )
@@ -1,5 +1,6 @@
 import psycopg2  # Changed from sqlite3
-import psycopg2.extras  # For dictionary cursor
+import psycopg2.extras  # For execute_values
+import psycopg2.pool  # For reusing connections across callers
 import datetime
 import uuid  # For generating initial schema version if needed, or other UUIDs
 
@@ -15,30 +16,67 @@ except ImportError:
     exit(1)
 
 
+_connection_pool = None  # Created lazily by get_db_connection()
+
+
 def get_db_connection():
-    """Establishes a connection to the PostgreSQL database."""
+    """Gets a connection to the PostgreSQL database from a shared connection pool.
+
+    The pool is created on first use so repeated callers reuse open connections
+    instead of paying a new connect/auth handshake each time. Hand connections
+    back with release_db_connection() rather than closing them.
+    """
+    global _connection_pool
     if not all([PG_DATABASE, PG_USER, PG_PASSWORD]):
         print(
             "Database connection cannot be established: Missing PG_DATABASE, PG_USER, or PG_PASSWORD in config."
         )
         return None
     try:
-        conn = psycopg2.connect(
-            host=PG_HOST,
-            port=PG_PORT,
-            dbname=PG_DATABASE,
-            user=PG_USER,
-            password=PG_PASSWORD,
-        )
-        # conn.row_factory is not a direct attribute. Use cursor_factory for dict-like rows.
-        # psycopg2.extras.DictCursor will allow accessing columns by name.
-        print(
-            f"Successfully connected to PostgreSQL database: {PG_DATABASE} on {PG_HOST}:{PG_PORT}"
-        )
-        return conn
+        if _connection_pool is None:
+            _connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                minconn=1,
+                maxconn=8,
+                host=PG_HOST,
+                port=PG_PORT,
+                dbname=PG_DATABASE,
+                user=PG_USER,
+                password=PG_PASSWORD,
+            )
+            print(
+                f"Successfully connected to PostgreSQL database: {PG_DATABASE} on {PG_HOST}:{PG_PORT}"
+            )
+        return _connection_pool.getconn()
     except psycopg2.OperationalError as e:
         print(f"Error connecting to PostgreSQL database: {e}")
         return None
+    except psycopg2.pool.PoolError as e:
+        print(f"Error getting a connection from the PostgreSQL pool: {e}")
+        return None
+
+
+def release_db_connection(conn):
+    """Returns a connection obtained from get_db_connection() to the pool.
+
+    Any open transaction is rolled back by the pool before the connection is reused.
+    """
+    if conn is None:
+        return
+    if _connection_pool is not None:
+        _connection_pool.putconn(conn)
+    else:
+        conn.close()
+
+
+def close_db_pool():
+    """Closes every connection in the shared pool; call once when a script shuts down.
+
+    A later get_db_connection() call creates a fresh pool.
+    """
+    global _connection_pool
+    if _connection_pool is not None:
+        _connection_pool.closeall()
+        _connection_pool = None
 
 
 def create_schema_if_not_exists(conn, schema_name):
@@ -60,11 +98,15 @@ def create_tables(conn, schema=PG_SCHEMA):
     # Create schema first if not public
     create_schema_if_not_exists(conn, schema)
 
-    # Using psycopg2.extras.DictCursor for easier row access by name later, though not strictly needed for DDL
-    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        # SchemaVersions Table for PostgreSQL
+    with conn.cursor() as cursor:
+        # SchemaVersions and XMLFilesProcessed tables for PostgreSQL, sent as a
+        # single multi-statement batch to save a round-trip per table.
+        # Setup is idempotent and safe to re-run after a crash, so don't wait
+        # on the WAL flush when committing it.
         cursor.execute(
             f"""
+        SET LOCAL synchronous_commit = off;
+
         CREATE TABLE IF NOT EXISTS "{schema}".SchemaVersions (
             SchemaVersionID SERIAL PRIMARY KEY, -- PostgreSQL auto-incrementing integer
             VersionNumber TEXT NOT NULL UNIQUE,
@@ -73,13 +115,7 @@ def create_tables(conn, schema=PG_SCHEMA):
             Description TEXT,
             DemographicGroup TEXT NULL -- Remains for now
         );
-        """
-        )
-        print(f"Checked/Created {schema}.SchemaVersions table.")
 
-        # XMLFilesProcessed Table for PostgreSQL
-        cursor.execute(
-            f"""
         CREATE TABLE IF NOT EXISTS "{schema}".XMLFilesProcessed (
             ProcessedFileID TEXT PRIMARY KEY,
             OriginalFileName TEXT NOT NULL,
@@ -92,6 +128,7 @@ def create_tables(conn, schema=PG_SCHEMA):
         );
         """
         )
+        print(f"Checked/Created {schema}.SchemaVersions table.")
         print(f"Checked/Created {schema}.XMLFilesProcessed table.")
 
     conn.commit()  # Commit DDL changes
@@ -106,21 +143,24 @@ def add_initial_schema_version(
     schema=PG_SCHEMA,
 ):
     """Adds an initial record to the SchemaVersions table if no versions exist."""
-    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-        cursor.execute(
-            f'SELECT COUNT(*) AS count FROM "{schema}".SchemaVersions'
-        )  # Use AS for column name with DictCursor
-        if cursor.fetchone()["count"] == 0:
+    with conn.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM "{schema}".SchemaVersions')
+        if cursor.fetchone()[0] == 0:
             creation_date = datetime.datetime.now(
                 datetime.timezone.utc
             )  # Use timezone-aware datetime
+            versions = [
+                (version_number, creation_date, description, demographic_group)
+            ]
             try:
-                cursor.execute(
+                # execute_values sends every row in one multi-row INSERT
+                psycopg2.extras.execute_values(
+                    cursor,
                     f"""
                 INSERT INTO "{schema}".SchemaVersions (VersionNumber, CreationDate, Description, DemographicGroup)
-                VALUES (%s, %s, %s, %s)
+                VALUES %s
                 """,
-                    (version_number, creation_date, description, demographic_group),
+                    versions,
                 )
                 conn.commit()  # Commit this insert
                 print(
@@ -158,6 +198,7 @@ if __name__ == "__main__":
         print(f"An unexpected error occurred during PostgreSQL setup: {e}")
     finally:
         if db_conn:
-            db_conn.close()
-            print("PostgreSQL database connection closed.")
+            release_db_connection(db_conn)
+        close_db_pool()
+        print("PostgreSQL database connection closed.")
     print("PostgreSQL Database setup script for dynamic schema v4 finished.")
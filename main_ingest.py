@@ -1,11 +1,17 @@
 import sys
 import psycopg2
-import psycopg2.extras
+import psycopg2.extensions
 from psycopg2 import errors as psycopg2_errors  # Import for specific error codes
 import uuid
 import datetime
+import itertools
+import contextlib
+import xml.etree.ElementTree as ET
 import os
 import hashlib
+import io
+import mmap
+import struct
 import argparse
 import shutil
 import re  # For more advanced sanitization if needed
@@ -13,9 +19,13 @@ import re  # For more advanced sanitization if needed
 # Project-specific imports
 try:
     from config import PG_SCHEMA
-    from database_setup import get_db_connection  # Expects database_setup to be updated
+    from database_setup import (
+        get_db_connection,
+        release_db_connection,
+        close_db_pool,
+    )  # Expects database_setup to be updated
     from xml_handler import (
-        parse_xml_file,
+        iter_xml_elements,
         _sanitize_name as sanitize_xml_name,
     )  # Use sanitizer from xml_handler
 except ImportError as e:
@@ -29,6 +39,18 @@ ARCHIVE_DIR = "processed_xml_archive"
 ERROR_DIR = "error_files"
 # Schema version for the ingestion LOGIC, not the data schema itself which is now dynamic
 INGESTION_LOGIC_VERSION_NUMBER = "1.0.0-dynamic-ingestor-v4"
+# Read size used when hashing XML files (large reads keep per-chunk overhead negligible)
+HASH_CHUNK_SIZE = 1 << 20
+# PostgreSQL truncates identifiers longer than this (NAMEDATALEN - 1)
+PG_MAX_IDENTIFIER_LENGTH = 63
+# Characters kept from each table name in a hashed FK constraint name: fk_ + 26 + _ + 26 + _ + 6 hex = 63
+FK_NAME_PART_LENGTH = 26
+
+# Elements staged per batch while streaming a file (bounds memory for large XMLs)
+STREAM_BATCH_SIZE = 5000
+# Largest file hashed through a single mmap; bigger files (or any file on 32-bit builds
+# beyond 2 GiB) are hashed with chunked reads instead
+MMAP_HASH_MAX_SIZE = sys.maxsize if sys.maxsize > 2**32 else 2**31 - 1
 
 
 # --- Utility Functions ---
@@ -37,12 +59,28 @@ def generate_unique_file_id():
 
 
 def get_file_md5(file_path):
-    hash_md5 = hashlib.md5()
     try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+        with open(file_path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            # Read-ahead hint. process_xml_file hashes a file right before parsing it, so the
+            # parse reads it back from the page cache
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            if 0 < size <= MMAP_HASH_MAX_SIZE:
+                # Hash the whole mapping in one update(); hashlib walks it in C without the GIL
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        if hasattr(mapped, "madvise"):  # Python 3.8+ on Unix
+                            mapped.madvise(mmap.MADV_SEQUENTIAL)
+                        return hashlib.md5(mapped).hexdigest()
+                except (OSError, ValueError):
+                    pass  # Not mappable (e.g. special filesystem); use the chunked path
+            if hasattr(hashlib, "file_digest"):  # Python 3.11+: C read/hash loop
+                return hashlib.file_digest(f, "md5").hexdigest()
+            hash_md5 = hashlib.md5()
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
                 hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            return hash_md5.hexdigest()
     except FileNotFoundError:
         return None  # Error printed by caller if needed
     except Exception as e:
@@ -52,13 +90,13 @@ def get_file_md5(file_path):
 
 def get_ingestion_logic_schema_id(conn, version_number):
     try:
-        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+        with conn.cursor() as cursor:
             cursor.execute(
                 f'SELECT SchemaVersionID FROM "{PG_SCHEMA}".SchemaVersions WHERE VersionNumber = %s',
                 (version_number,),
             )
             result = cursor.fetchone()
-            return result["schemaversionid"] if result else None
+            return result[0] if result else None
     except psycopg2.Error as e:
         print(f"DB Error getting schema id: {e}")
         return None
@@ -71,8 +109,19 @@ def log_processed_file(
     md5_hash,
     status,
     schema_version_id,
+    commit=True,
+    timestamp=None,
 ):
-    timestamp = datetime.datetime.now(datetime.timezone.utc)
+    """
+    Insert a status record for a processed XML file into XMLFilesProcessed.
+
+    With commit=True (error paths) the record is committed on its own and database errors are
+    reported and rolled back. With commit=False the insert joins the caller's open transaction,
+    so a file's data and its success record are committed together; errors are re-raised for the
+    caller to roll back. `timestamp` defaults to the current UTC time.
+    """
+    if timestamp is None:
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
     try:
         with conn.cursor() as cursor:
             cursor.execute(
@@ -87,14 +136,17 @@ def log_processed_file(
                     None,
                 ),
             )
-        conn.commit()
+        if commit:
+            conn.commit()
         print(
             f"Logged file {original_file_name} (ID: {processed_file_id}) with status {status}."
         )
         return True
     except psycopg2.Error as e:
-        conn.rollback()
         print(f"DB error logging processed file {original_file_name}: {e}")
+        if not commit:
+            raise  # Let the caller roll back the whole file
+        conn.rollback()
         return False
 
 
@@ -141,12 +193,41 @@ def move_to_error_directory(file_path, error_directory=ERROR_DIR):
 
 # --- Dynamic Schema and Data Insertion Functions ---
 
-_table_column_cache = {}  # Cache for table schemas: {table_name: {column_names}}
+_table_column_cache = {}  # Cache for table schemas: {table_name (lowercase): {column_names}}
+
+
+def prefetch_schema_cache(conn):
+    """
+    Load the column names of every base table in PG_SCHEMA into _table_column_cache with one query.
+
+    Replaces the per-table information_schema lookups get_table_columns() would otherwise
+    issue. Tables created after the prefetch are added to the cache by ensure_all_tables_and_columns().
+    """
+    schema_columns = {}
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, a.attname
+            FROM pg_catalog.pg_class c
+            INNER JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+            WHERE c.relnamespace = (
+                    SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %s
+                )
+                AND c.relkind = 'r'
+                AND a.attnum > 0
+                AND NOT a.attisdropped
+            """,
+            (PG_SCHEMA,),
+        )
+        for table_name, column_name in cursor.fetchall():
+            schema_columns.setdefault(table_name, set()).add(column_name)
+    _table_column_cache.clear()
+    _table_column_cache.update(schema_columns)
 
 
 def get_table_columns(conn, table_name):
     """Retrieves column names for a given table, using a cache."""
-    safe_table_name = sanitize_xml_name(table_name)
+    safe_table_name = sanitize_xml_name(table_name).lower()
     if safe_table_name in _table_column_cache:
         return _table_column_cache[safe_table_name]
 
@@ -155,7 +236,7 @@ def get_table_columns(conn, table_name):
         with conn.cursor() as cursor:
             cursor.execute(
                 "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s",
-                (PG_SCHEMA, safe_table_name.lower()),
+                (PG_SCHEMA, safe_table_name),
             )
             cols = {row[0] for row in cursor.fetchall()}
             _table_column_cache[safe_table_name] = cols
@@ -166,173 +247,421 @@ def get_table_columns(conn, table_name):
     return cols
 
 
-def ensure_table_and_columns(
-    conn, table_name_suggestion, element_attributes, common_db_columns
-):
+def _common_column_defs(value_column_name):
+    """Column definitions every dynamic table is created with, including its per-table value column."""
+    return [
+        '"element_id" TEXT PRIMARY KEY',
+        '"parent_element_id" TEXT',
+        '"pcr_uuid_context" TEXT',
+        '"original_tag_name" TEXT',
+        f'"{value_column_name}" TEXT',
+    ]
+
+
+def plan_schema(elements, sanitized_attr_map):
     """
-    Ensure a sanitized table exists for the given XML element and that it contains the required common and attribute-derived columns.
-    
-    This will:
-    - Sanitize table_name_suggestion to produce the final table name (returned as table_name_raw).
-    - Create the table in PG_SCHEMA if it does not exist, including a dynamic per-table text column named "<table>_value" (lowercase) plus standard common columns:
-      element_id (PRIMARY KEY), parent_element_id, pcr_uuid_context, original_tag_name, and the dynamic value column.
-    - Add any missing attribute-derived TEXT columns (sanitized) to the existing table.
-    - Cache the discovered/created column names in the module-level _table_column_cache.
-    
+    Work out which tables and attribute columns a batch of parsed elements needs.
+
     Parameters:
-    - table_name_suggestion (str): Suggested XML tag/name to use as the table name (will be sanitized).
-    - element_attributes (Mapping[str, Any]): Attributes from the XML element; keys are sanitized and added as TEXT columns when needed.
-    - common_db_columns (Iterable[str]): Base/common column names used by the ingestion logic (informational; table creation uses its own common set).
-    
+    - elements (Iterable[dict]): Element records as yielded by xml_handler.iter_xml_elements.
+    - sanitized_attr_map (Mapping[str, str]): Raw attribute name -> sanitized lowercase column name.
+
     Returns:
-    - tuple (table_name_raw, columns_set, value_column_name):
-        - table_name_raw (str | None): Sanitized table name (unquoted). None if sanitization failed or on a creation error.
-        - columns_set (set): Set of existing column names (lowercase) for the table after creation/alteration. Empty set on error.
-        - value_column_name (str | None): Name of the per-table text column (lowercase "<table>_value"). None on error.
-    
-    Notes:
-    - On PostgreSQL errors during creation/alteration the function attempts to roll back and returns (None, set(), None) or returns the current state after partial changes.
-    - The function writes to the database and updates _table_column_cache; callers should provide a valid DB connection and handle transaction scope.
+    - dict: {table_name_lowercase: {"columns": set of attribute column names, "element_path": str | None}},
+      where element_path comes from the first element of that table carrying an "element_path" attribute
+      and is used as the comment of a newly created table.
     """
-    cursor = conn.cursor()
-    table_name_raw = sanitize_xml_name(table_name_suggestion)
-    if not table_name_raw:
-        print("Error: Table name suggestion is empty after sanitization.")
-        return None, set(), None
+    plan = {}
+    for element in elements:
+        table_name_lowercase = sanitize_xml_name(element["table_suggestion"]).lower()
+        table_plan = plan.setdefault(
+            table_name_lowercase, {"columns": set(), "element_path": None}
+        )
+        for attr_key in element["attributes"]:
+            table_plan["columns"].add(sanitized_attr_map[attr_key])
+        if table_plan["element_path"] is None and "element_path" in element["attributes"]:
+            table_plan["element_path"] = element["attributes"]["element_path"]
+    return plan
 
-    table_name = f'"{table_name_raw.lower()}"'
 
-    existing_columns = get_table_columns(conn, table_name_raw)
+def ensure_all_tables_and_columns(conn, plan):
+    """
+    Create or widen every table in a schema plan with a single multi-statement DDL call.
 
-    # Generate dynamic column name for the text content based on table name (lowercase to match table naming)
-    value_column_name = f"{table_name_raw.lower()}_value"
+    New tables get one CREATE TABLE IF NOT EXISTS carrying the common columns, their dynamic
+    "<table>_value" column and all planned attribute columns (plus a COMMENT when the plan has an
+    element_path). Existing tables get one ALTER TABLE ... ADD COLUMN IF NOT EXISTS a TEXT, ...
+    for whatever attribute columns they lack. All statements are sent in one round-trip, so each
+    table is locked once per batch instead of once per missing column. _table_column_cache is
+    updated only after the DDL succeeds.
 
-    common_cols_sql = [
-        '"element_id" TEXT PRIMARY KEY',
-        '"parent_element_id" TEXT',
-        '"pcr_uuid_context" TEXT',
-        '"original_tag_name" TEXT',
-        f'"{value_column_name}" TEXT',
-    ]
+    Parameters:
+    - plan (dict): Output of plan_schema().
 
-    if not existing_columns:
-        attr_cols_for_create = []
-        current_common_names = {c.split()[0].strip('"') for c in common_cols_sql}
-        for attr in element_attributes.keys():
-            sanitized_attr = sanitize_xml_name(attr).lower()
-            if sanitized_attr not in current_common_names:
-                attr_cols_for_create.append(f'"{sanitized_attr}" TEXT')
-                current_common_names.add(sanitized_attr)
-
-        final_cols_for_create = common_cols_sql + list(set(attr_cols_for_create))
-        columns_sql = ", ".join(final_cols_for_create)
-        create_sql = (
-            f'CREATE TABLE IF NOT EXISTS "{PG_SCHEMA}".{table_name} ({columns_sql});'
-        )
-        try:
-            cursor.execute(create_sql)
+    Returns:
+    - set: Lowercase names of the tables this call created.
+
+    Raises:
+    - psycopg2.Error: If any statement fails; the caller is expected to roll back the transaction.
+    """
+    statements = []
+    params = []
+    created_tables = {}
+    altered_tables = {}
+
+    for table_name_lowercase, table_plan in plan.items():
+        table_name = f'"{PG_SCHEMA}"."{table_name_lowercase}"'
+        common_cols_sql = _common_column_defs(f"{table_name_lowercase}_value")
+        common_names = {c.split()[0].strip('"') for c in common_cols_sql}
+        attr_columns = sorted(table_plan["columns"] - common_names)
+
+        existing_columns = get_table_columns(conn, table_name_lowercase)
+        if not existing_columns:
+            final_cols_for_create = common_cols_sql + [f'"{c}" TEXT' for c in attr_columns]
+            statements.append(
+                f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(final_cols_for_create)});"
+            )
             # Set table comment to element_path (from the first element)
-            if "element_path" in element_attributes:
-                element_path_str = element_attributes["element_path"]
-                cursor.execute(
-                    f'COMMENT ON TABLE "{PG_SCHEMA}".{table_name} IS %s;',
-                    (element_path_str,),
+            if table_plan["element_path"] is not None:
+                statements.append(f"COMMENT ON TABLE {table_name} IS %s;")
+                params.append(table_plan["element_path"])
+            created_tables[table_name_lowercase] = common_names | set(attr_columns)
+        else:
+            missing_attr_cols = [c for c in attr_columns if c not in existing_columns]
+            if missing_attr_cols:
+                # IF NOT EXISTS: the cache lives across files, so another session may have added
+                # a column since it was loaded
+                add_columns_sql = ", ".join(
+                    f'ADD COLUMN IF NOT EXISTS "{c}" TEXT' for c in missing_attr_cols
                 )
-            created_cols = {
-                col_def.split()[0].strip('"').lower()
-                for col_def in final_cols_for_create
-            }
-            _table_column_cache[table_name_raw] = created_cols
-            print(f"Table {table_name} created.")
-        except psycopg2.Error as e:
-            print(f"Error creating table {table_name}: {e}")
-            conn.rollback()
-            return None, set(), None
-
-    current_table_cols = get_table_columns(conn, table_name_raw)
-    missing_attr_cols = set()
-    for attr in element_attributes.keys():
-        sanitized_attr = sanitize_xml_name(attr).lower()
-        if sanitized_attr not in current_table_cols and sanitized_attr not in {
-            c.split()[0].strip('"') for c in common_cols_sql
-        }:
-            missing_attr_cols.add(sanitized_attr)
-
-    for col_name in missing_attr_cols:
-        col_name_quoted = f'"{col_name}"'
-        try:
-            cursor.execute(
-                f'ALTER TABLE "{PG_SCHEMA}".{table_name} ADD COLUMN {col_name_quoted} TEXT;'
-            )
-            print(f"Added column {col_name_quoted} to {table_name}")
-            _table_column_cache[table_name_raw].add(col_name)
-        except psycopg2.Error as e:
-            print(f"Error adding {col_name_quoted} to {table_name}: {e}")
-            conn.rollback()
+                statements.append(f"ALTER TABLE {table_name} {add_columns_sql};")
+                altered_tables[table_name_lowercase] = missing_attr_cols
 
-    return table_name_raw, get_table_columns(conn, table_name_raw), value_column_name
+    if not statements:
+        return set()
 
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("\n".join(statements), params or None)
+    except psycopg2.Error as e:
+        print(
+            f"Error creating/altering tables {sorted(set(created_tables) | set(altered_tables))}: {e}"
+        )
+        raise  # Reraise to trigger transaction rollback
+
+    for table_name_lowercase, columns in created_tables.items():
+        _table_column_cache[table_name_lowercase] = columns
+        print(f'Table "{table_name_lowercase}" created.')
+    for table_name_lowercase, missing_attr_cols in altered_tables.items():
+        _table_column_cache[table_name_lowercase].update(missing_attr_cols)
+        print(
+            f'Added columns {", ".join(missing_attr_cols)} to "{table_name_lowercase}"'
+        )
+    return set(created_tables)
+
+
+# PostgreSQL binary COPY framing: signature + flags + header-extension length, and the end-of-data marker
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+COPY_BINARY_NULL = struct.pack("!i", -1)
+
+
+def _copy_binary_row(row, codec):
+    """Encodes one row for PostgreSQL's binary COPY format; every dynamic column is TEXT, so each field is length-prefixed text in `codec` (None becomes NULL)."""
+    parts = [struct.pack("!h", len(row))]
+    for value in row:
+        if value is None:
+            parts.append(COPY_BINARY_NULL)
+        else:
+            encoded = str(value).encode(codec)
+            parts.append(struct.pack("!i", len(encoded)))
+            parts.append(encoded)
+    return b"".join(parts)
+
+
+def copy_rows(cursor, table_name_raw, columns, rows):
+    """
+    Bulk-load rows into a dynamic table with a single binary COPY ... FROM STDIN.
+
+    Values are sent length-prefixed, so neither side has to escape or re-parse text. The server
+    decodes binary text fields with the session's client_encoding, so values are encoded with the
+    connection's codec rather than assumed UTF-8. This relies on every dynamic column being TEXT,
+    which ensure_all_tables_and_columns guarantees.
+
+    Parameters:
+        table_name_raw (str): Unquoted table name in PG_SCHEMA.
+        columns (Sequence[str]): Column names, in the order of each row's values.
+        rows (Iterable[tuple]): Row value tuples; None values are loaded as NULL.
 
-def delete_existing_pcr_data(conn, pcr_uuid):
+    Raises:
+        psycopg2.Error: Propagates database errors so the caller can roll back.
     """
-    Delete all rows referencing a PCR UUID from every dynamic table in the configured schema.
+    codec = psycopg2.extensions.encodings[cursor.connection.encoding]
+    buffer = io.BytesIO()
+    buffer.write(COPY_BINARY_HEADER)
+    for row in rows:
+        buffer.write(_copy_binary_row(row, codec))
+    buffer.write(COPY_BINARY_TRAILER)
+    buffer.seek(0)
+
+    cols_for_sql = ", ".join([f'"{k}"' for k in columns])
+    cursor.copy_expert(
+        f'COPY "{PG_SCHEMA}"."{table_name_raw}" ({cols_for_sql}) FROM STDIN WITH (FORMAT binary)',
+        buffer,
+    )
+
+
+def delete_existing_pcr_data(conn, pcr_uuids):
+    """
+    Delete all rows referencing any of the given PCR UUIDs from every dynamic table in the configured schema.
     
-    Scans all base tables in PG_SCHEMA (excluding system tables and the static SchemaVersions/XMLFilesProcessed tables). For each table that contains a pcr_uuid_context column, deletes rows where pcr_uuid_context equals the provided pcr_uuid and prints per-table and total deletion counts.
+    Lists the base tables of PG_SCHEMA that have a pcr_uuid_context column straight from the catalog on every call (not from _table_column_cache, which may miss tables another session created since it was loaded). Every such table gets its own DELETE ... RETURNING, and all of them are sent as data-modifying CTEs of one statement, so the whole pre-deletion is a single round-trip however many tables exist. Per-table and total deletion counts are printed.
     
     Parameters:
-        pcr_uuid (str): The PatientCareReport UUID whose associated rows should be removed. If falsy, the function returns immediately.
+        pcr_uuids (list[str]): The PatientCareReport UUIDs whose associated rows should be removed. If empty, the function returns immediately.
     
     Raises:
         psycopg2.Error: Propagates database errors encountered while listing tables or performing deletes.
     """
-    if not pcr_uuid:
+    pcr_uuids = [pcr_uuid for pcr_uuid in pcr_uuids if pcr_uuid]
+    if not pcr_uuids:
         return
     print(
-        f"Checking if PatientCareReport UUID: {pcr_uuid} exists in any dynamic tables. If found, it will be deleted before new data is inserted."
+        f"Checking if {len(pcr_uuids)} PatientCareReport UUID(s) exist in any dynamic tables. If found, they will be deleted before new data is inserted."
     )
-    deleted_total = 0
     try:
         with conn.cursor() as cursor:
             cursor.execute(
                 """
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = %s AND table_type = 'BASE TABLE'
-                AND table_name NOT LIKE 'pg_%%'
-                AND table_name NOT IN ('SchemaVersions', 'XMLFilesProcessed')
-            """,
+                SELECT c.relname
+                FROM pg_catalog.pg_class c
+                INNER JOIN pg_catalog.pg_attribute a ON a.attrelid = c.oid
+                WHERE c.relnamespace = (
+                        SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %s
+                    )
+                    AND c.relkind = 'r'
+                    AND a.attname = 'pcr_uuid_context'
+                    AND NOT a.attisdropped
+                ORDER BY c.relname
+                """,
                 (PG_SCHEMA,),
             )
-            tables_to_check = [row[0] for row in cursor.fetchall()]
-
-            for table_name_raw in tables_to_check:
-                columns = get_table_columns(conn, table_name_raw)
-                if "pcr_uuid_context" in columns:
-                    table_name_quoted = f'"{PG_SCHEMA}"."{table_name_raw}"'
-                    try:
-                        cursor.execute(
-                            f'DELETE FROM {table_name_quoted} WHERE "pcr_uuid_context" = %s',
-                            (pcr_uuid,),
-                        )
-                        deleted_total += cursor.rowcount
-                        if cursor.rowcount > 0:
-                            print(
-                                f"  Deleted {cursor.rowcount} rows from {table_name_quoted}"
-                            )
-                    except psycopg2.Error as e:
-                        print(f"Error deleting from {table_name_quoted}: {e}")
-                        raise  # Re-raise the exception
+            tables_to_clear = [row[0] for row in cursor.fetchall()]
+        if not tables_to_clear:
+            return
+
+        # The UUID array is bound once and shared by every per-table DELETE
+        delete_ctes = ",\n".join(
+            f'd{i} AS (DELETE FROM "{PG_SCHEMA}"."{table_name_raw}" '
+            f'WHERE "pcr_uuid_context" IN (SELECT pcr_uuid FROM pcr) RETURNING 1)'
+            for i, table_name_raw in enumerate(tables_to_clear)
+        )
+        delete_counts = "\nUNION ALL\n".join(
+            f"SELECT {i}, COUNT(*) FROM d{i}" for i in range(len(tables_to_clear))
+        )
+        delete_sql = (
+            f"WITH pcr AS (SELECT unnest(%s::text[]) AS pcr_uuid),\n"
+            f"{delete_ctes}\n{delete_counts}"
+        )
+
+        deleted_total = 0
+        with conn.cursor() as cursor:
+            cursor.execute(delete_sql, (pcr_uuids,))
+            for table_index, deleted_count in sorted(cursor.fetchall()):
+                deleted_total += deleted_count
+                if deleted_count > 0:
+                    print(
+                        f'  Deleted {deleted_count} rows from "{PG_SCHEMA}"."{tables_to_clear[table_index]}"'
+                    )
         if deleted_total > 0:
-            print(f"Total rows deleted for PCR {pcr_uuid}: {deleted_total}")
+            print(
+                f"Total rows deleted for {len(pcr_uuids)} PCR(s): {deleted_total}"
+            )
     except psycopg2.Error as e:
         print(f"DB error during PCR deletion: {e}")
         raise  # Re-raise the exception
 
 
+def get_existing_constraints(conn):
+    """
+    Return every constraint already defined on a table in PG_SCHEMA as a set of (table_name, constraint_name) pairs.
+
+    Used by the FK creation step to skip constraints that already exist with one catalog query per
+    file rather than one information_schema lookup per constraint.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, con.conname
+            FROM pg_catalog.pg_constraint con
+            INNER JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+            WHERE c.relnamespace = (
+                    SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %s
+                )
+            """,
+            (PG_SCHEMA,),
+        )
+        return set(cursor.fetchall())
+
+
+def fk_constraint_name(child_table_raw, parent_table_raw_sanitized):
+    """
+    Build the name of the parent_element_id foreign key from a child table to its parent table.
+
+    Returns "fk_<child>_<parent>" when that fits PostgreSQL's 63-character identifier limit;
+    otherwise "fk_<child[:26]>_<parent[:26]>_<6 hex chars of the ideal name's MD5>", which is at
+    most 63 characters and keeps truncated names of different table pairs apart. The scheme is
+    kept stable so constraints created by earlier runs are recognised as already existing.
+    """
+    ideal_constraint_name = f"fk_{child_table_raw}_{parent_table_raw_sanitized}"
+    if len(ideal_constraint_name) <= PG_MAX_IDENTIFIER_LENGTH:
+        return ideal_constraint_name
+    hash_suffix = hashlib.md5(ideal_constraint_name.encode()).hexdigest()[:6]
+    return (
+        f"fk_{child_table_raw[:FK_NAME_PART_LENGTH]}"
+        f"_{parent_table_raw_sanitized[:FK_NAME_PART_LENGTH]}_{hash_suffix}"
+    )
+
+
+def flush_pending_tables(cursor, pending_tables):
+    """
+    COPY every queued table of stage_elements() in queue order, parents first.
+
+    Rows queued before one of their table's columns appeared are padded with NULL for it.
+    Raises psycopg2.Error on a COPY failure so the caller can roll back.
+    """
+    for table_name_lowercase, pending in pending_tables.items():
+        columns = pending["cols"]
+        rows = pending["rows"]
+        width = len(columns)
+        for row in rows:
+            if len(row) < width:
+                row.extend([None] * (width - len(row)))
+        try:
+            copy_rows(cursor, table_name_lowercase, columns, rows)
+        except psycopg2.Error as e:
+            print(
+                f"DB COPY Error: {e} TABLE: {table_name_lowercase} COLS: {columns} ROWS: {len(rows)}"
+            )
+            raise  # Reraise to trigger transaction rollback
+
+
+def stage_elements(
+    db_conn,
+    cursor,
+    elements,
+    current_file_foreign_keys,
+    cleared_pcr_uuids,
+    created_tables,
+):
+    """
+    Stage one batch of parsed XML elements into their dynamic tables.
+    
+    Ensures each element's table and attribute columns exist, records inferred parent→child
+    foreign keys in `current_file_foreign_keys`, deletes the existing rows of PCR UUIDs that
+    first appear in this batch (tracked across batches in `cleared_pcr_uuids` so rows staged by an
+    earlier batch are never deleted), then bulk-loads the batch with one COPY per table. Tables
+    created for the batch are added to `created_tables`.
+
+    Tables are loaded parent-first: elements arrive in document order (parents before children),
+    so tables are queued in first-seen order and flushed in that order, and a parent row reaches the
+    database before any row referencing it, as the parent_element_id foreign keys require.
+    
+    Raises:
+        psycopg2.Error: On any DDL, delete or COPY failure; the caller is expected to roll back.
+    """
+    # Rows awaiting insertion, column-aligned per table:
+    # {table_name_lowercase: {"cols": [column, ...], "index": {column: position}, "rows": [values_list, ...]}}
+    pending_tables = {}
+
+    # Sanitize the batch's attribute-name vocabulary once; the element loop then only does dict lookups
+    sanitized_attr_map = {
+        attr_key: sanitize_xml_name(attr_key).lower()
+        for attr_key in {key for element in elements for key in element["attributes"]}
+    }
+
+    # Create/widen every table the batch needs up front, in one DDL round-trip
+    created_tables.update(
+        ensure_all_tables_and_columns(db_conn, plan_schema(elements, sanitized_attr_map))
+    )
+
+    # Delete existing data for PCRs first seen in this batch BEFORE inserting their new rows
+    batch_pcr_uuids = {
+        element["pcr_uuid_context"]
+        for element in elements
+        if element.get("pcr_uuid_context")
+    }
+    new_pcr_uuids = batch_pcr_uuids - cleared_pcr_uuids
+    if new_pcr_uuids:
+        print(
+            f"Found {len(new_pcr_uuids)} new PatientCareReport UUID(s) in this file for potential data overwrite."
+        )
+        delete_existing_pcr_data(db_conn, sorted(new_pcr_uuids))
+        cleared_pcr_uuids.update(new_pcr_uuids)
+
+    for element in elements:
+        # Retrieve parent_table_suggestion from the element
+        parent_table_suggestion_raw = element.get("parent_table_suggestion")
+
+        # Map this element's attribute names to column names
+        attribute_columns = {
+            sanitized_attr_map[attr_key]: attr_value
+            for attr_key, attr_value in element["attributes"].items()
+        }
+
+        table_name_raw = sanitize_xml_name(element["table_suggestion"])
+        actual_table_columns = _table_column_cache[table_name_raw.lower()]
+        # Dynamic column name for the text content, based on the (lowercase) table name
+        value_column_name = f"{table_name_raw.lower()}_value"
+
+        # Logic for preparing foreign key definition
+        if parent_table_suggestion_raw and element.get("parent_element_id"):
+            # Ensure parent_table_suggestion is sanitized and lowercased, similar to child table names
+            sanitized_parent_table_name = sanitize_xml_name(parent_table_suggestion_raw)
+            if sanitized_parent_table_name:  # Ensure it's not empty after sanitization
+                # Add to set as a tuple: (child_table_raw, parent_table_raw_sanitized)
+                # table_name_raw is already sanitized above
+                current_file_foreign_keys.add(
+                    (table_name_raw, sanitized_parent_table_name)
+                )
+
+        # Prepare data for insertion
+        insert_data = {
+            "element_id": element["element_id"],
+            "parent_element_id": element.get("parent_element_id"),
+            "pcr_uuid_context": element.get("pcr_uuid_context"),
+            "original_tag_name": element["element_tag"],
+            value_column_name: element.get("text_content"),  # Use dynamic column name
+        }
+        insert_data.update(attribute_columns)
+
+        # Queue the row under its table, placing each value at its column's position;
+        # columns first seen on a later element extend the table's column list
+        pending = pending_tables.setdefault(
+            table_name_raw.lower(), {"cols": [], "index": {}, "rows": []}
+        )
+        column_index = pending["index"]
+        row = [None] * len(pending["cols"])
+        for k, v in insert_data.items():
+            # Only include columns that actually exist in the table
+            if k.lower() not in actual_table_columns:
+                continue
+            column_position = column_index.get(k)
+            if column_position is None:
+                column_position = column_index[k] = len(pending["cols"])
+                pending["cols"].append(k)
+                row.append(None)
+            row[column_position] = v
+        pending["rows"].append(row)
+
+    flush_pending_tables(cursor, pending_tables)
+
+
 def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
     """
     Process a single XML file, stage its data into dynamic PostgreSQL tables, create necessary foreign keys, and archive or move the file on error.
     
-    Parses the XML at `xml_file_path` into element records, computes a processed-file UUID and MD5, deletes any existing data for PCR UUIDs present in the file, ensures per-element destination tables and attribute columns (including a dynamic per-table value column) exist, inserts each element row, attempts to create any inferred parent→child foreign key constraints (ON DELETE CASCADE), and commits the transaction. On success the file is archived and a processed-file record is logged; on any database or unexpected error the transaction is rolled back, an error record is logged, and the file is moved to the error directory. The per-run table column cache is cleared after processing.
+    Computes a processed-file UUID and MD5, then streams the XML at `xml_file_path` in batches of STREAM_BATCH_SIZE element records (see stage_elements); for each batch it deletes any existing data for PCR UUIDs first seen in the batch, ensures per-element destination tables and attribute columns (including a dynamic per-table value column) exist, bulk-loads the element rows with one COPY per table, attempts to create any inferred parent→child foreign key constraints (ON DELETE CASCADE; validated at once on tables created by this file, added NOT VALID on older tables so their existing rows are not scanned), logs a processed-file record and commits everything as one transaction (with synchronous_commit off). On success the file is then archived; on any database or unexpected error the transaction is rolled back, an error record is logged, and the file is moved to the error directory. The table column cache is kept for later files and only invalidated when a transaction is rolled back.
     
     Parameters:
         xml_file_path (str): Path to the XML file to ingest. If missing or unreadable (MD5 failure), the file is logged and moved to the error directory.
@@ -350,11 +679,13 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
     
     Errors:
         - Database errors cause a transaction rollback and result in False being returned.
-        - XML parsing errors or empty parse results cause the file to be logged and moved to the error directory and return False.
+        - XML parsing errors roll back any rows already staged from the file, log it, move it to the error directory and return False.
     """
     print(f"\nProcessing XML: {xml_file_path}")
     processed_file_id = generate_unique_file_id()
+    processing_timestamp = datetime.datetime.now(datetime.timezone.utc)
     original_file_name = os.path.basename(xml_file_path)
+    # Hashed right before parsing, so the parse reads the file back from the page cache
     md5_hash = get_file_md5(xml_file_path)
 
     if md5_hash is None and os.path.exists(xml_file_path):
@@ -365,6 +696,7 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
             None,
             "Error_MD5",
             ingestion_schema_id,
+            timestamp=processing_timestamp,
         )
         move_to_error_directory(xml_file_path)
         return False
@@ -377,131 +709,69 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
             md5_hash if md5_hash else "N/A",
             "Error_FileNotFound",
             ingestion_schema_id,
+            timestamp=processing_timestamp,
         )
         # File doesn't exist, so no need to move it
         return False
 
-    elements_data = parse_xml_file(xml_file_path)
-
-    if not elements_data:
-        print(f"No elements parsed from {xml_file_path} or parsing error occurred.")
-        log_processed_file(
-            db_conn,
-            processed_file_id,
-            original_file_name,
-            md5_hash,
-            "Error_Parsing_Empty",
-            ingestion_schema_id,
-        )
-        move_to_error_directory(xml_file_path)
-        return False
-
-    # Collect all unique PCR UUIDs from the current file
-    unique_pcr_uuids_in_file = set()
-    for el in elements_data:
-        if el.get("pcr_uuid_context"):
-            unique_pcr_uuids_in_file.add(el["pcr_uuid_context"])
-
-    # Note: common_db_columns will be updated dynamically per element with the actual value column name
-    base_common_db_columns = {
-        "element_id",
-        "parent_element_id",
-        "pcr_uuid_context",
-        "original_tag_name",
-    }
-
     cursor = db_conn.cursor()
     try:
-        # Delete existing data for all PCRs found in this file BEFORE inserting new data
-        if unique_pcr_uuids_in_file:
-            print(
-                f"Found {len(unique_pcr_uuids_in_file)} unique PatientCareReport UUID(s) in this file for potential data overwrite."
-            )
-            for pcr_uuid in unique_pcr_uuids_in_file:
-                delete_existing_pcr_data(db_conn, pcr_uuid)
-        else:
-            print(
-                "No PatientCareReport UUIDs found in this file; no pre-deletion of data will occur."
-            )
+        # The whole file is one transaction; an XML file that is lost to a crash before the WAL
+        # flush is simply re-ingested, so don't wait for the flush at commit
+        cursor.execute("SET LOCAL synchronous_commit = off")
 
-        current_file_foreign_keys = set()  # Using a set to store tuples for uniqueness
-
-        for element in elements_data:
-            # Retrieve parent_table_suggestion from the element
-            parent_table_suggestion_raw = element.get("parent_table_suggestion")
+        # Load every table's columns once; the schema only grows, so the cache is kept across files
+        # and only dropped when a rollback undoes DDL. Columns another session adds meanwhile are
+        # tolerated (ADD COLUMN IF NOT EXISTS), and the PCR pre-delete reads its table list from the
+        # catalog rather than from this cache
+        if not _table_column_cache:
+            prefetch_schema_cache(db_conn)
 
-            table_name_raw, actual_table_columns, value_column_name = (
-                ensure_table_and_columns(
+        current_file_foreign_keys = set()  # Using a set to store tuples for uniqueness
+        cleared_pcr_uuids = set()  # PCR UUIDs whose existing rows were deleted in this transaction
+        created_tables = set()  # Tables created in this transaction; they hold only this file's rows
+
+        # Stream the file and stage it in bounded batches instead of materializing every element.
+        # closing() shuts the stream (and its file handle) even on error, before the file is moved.
+        with contextlib.closing(iter_xml_elements(xml_file_path)) as elements:
+            while True:
+                element_batch = list(itertools.islice(elements, STREAM_BATCH_SIZE))
+                if not element_batch:
+                    break
+                stage_elements(
                     db_conn,
-                    element["table_suggestion"],
-                    element["attributes"],
-                    base_common_db_columns,
+                    cursor,
+                    element_batch,
+                    current_file_foreign_keys,
+                    cleared_pcr_uuids,
+                    created_tables,
                 )
-            )
-
-            if not table_name_raw or not actual_table_columns:
-                print(
-                    f"Skipping element due to table creation/alteration error for suggested table {table_name_raw}"
-                )
-                raise psycopg2.Error(
-                    f"Failed to ensure table/columns for {table_name_raw}"
-                )  # Trigger rollback
-
-            # Logic for preparing foreign key definition
-            if parent_table_suggestion_raw and element.get("parent_element_id"):
-                # Ensure parent_table_suggestion is sanitized and lowercased, similar to child table names
-                sanitized_parent_table_name = sanitize_xml_name(
-                    parent_table_suggestion_raw
-                )
-                if (
-                    sanitized_parent_table_name
-                ):  # Ensure it's not empty after sanitization
-                    # Add to set as a tuple: (child_table_raw, parent_table_raw_sanitized)
-                    # table_name_raw is already sanitized from ensure_table_and_columns
-                    current_file_foreign_keys.add(
-                        (table_name_raw, sanitized_parent_table_name)
-                    )
 
-            # Prepare data for insertion
-            insert_data = {
-                "element_id": element["element_id"],
-                "parent_element_id": element.get("parent_element_id"),
-                "pcr_uuid_context": element.get("pcr_uuid_context"),
-                "original_tag_name": element["element_tag"],
-                value_column_name: element.get(
-                    "text_content"
-                ),  # Use dynamic column name
-            }
-            for attr_key, attr_value in element["attributes"].items():
-                insert_data[sanitize_xml_name(attr_key).lower()] = attr_value
-
-            # Filter data to only include columns that actually exist in the table
-            filtered_insert_data = {
-                k: v
-                for k, v in insert_data.items()
-                if k.lower() in actual_table_columns
-            }
-
-            cols_for_sql = ", ".join([f'"{k}"' for k in filtered_insert_data.keys()])
-            placeholders = ", ".join(["%s"] * len(filtered_insert_data))
-            values = tuple(filtered_insert_data.values())
-
-            table_name_quoted = f'"{PG_SCHEMA}"."{table_name_raw.lower()}"'
-            sql = f"INSERT INTO {table_name_quoted} ({cols_for_sql}) VALUES ({placeholders})"
-            try:
-                cursor.execute(sql, values)
-            except psycopg2.Error as e:
-                print(f"DB Insert Error: {e} SQL: {sql} VALS:{values}")
-                raise  # Reraise to trigger transaction rollback
+        if not cleared_pcr_uuids:
+            print(
+                "No PatientCareReport UUIDs found in this file; no pre-deletion of data will occur."
+            )
 
         print(
-            "--- Successfully completed data insertion loop. Proceeding to Foreign Key creation. ---"
+            "--- Successfully completed data insertion. Proceeding to Foreign Key creation. ---"
         )
         # After processing all elements, attempt to create foreign key constraints
         if current_file_foreign_keys:
             print(
                 f"Attempting to create {len(current_file_foreign_keys)} unique foreign key constraints for {xml_file_path}..."
             )
+            # Look up the schema's existing constraints once instead of once per FK
+            existing_constraints = get_existing_constraints(db_conn)
+            # Parent tables of this file's rows, per child table
+            file_parent_tables = {}
+            for child_table_raw, parent_table_raw_sanitized in current_file_foreign_keys:
+                file_parent_tables.setdefault(child_table_raw.lower(), set()).add(
+                    parent_table_raw_sanitized.lower()
+                )
+            # FKs on tables that existed before this file are added NOT VALID (no scan of rows
+            # already loaded); collect the statements that validate them so an operator can run
+            # them off-hours
+            new_fk_validations = []
             for (
                 child_table_raw,
                 parent_table_raw_sanitized,
@@ -509,142 +779,77 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
                 child_table_name_lowercase = child_table_raw.lower()
                 parent_table_name_lowercase = parent_table_raw_sanitized.lower()
 
-                ideal_constraint_name = (
-                    f"fk_{child_table_raw}_{parent_table_raw_sanitized}"
+                fk_constraint_name_unquoted = fk_constraint_name(
+                    child_table_raw, parent_table_raw_sanitized
                 )
-                fk_constraint_name_unquoted = ""
-
-                if len(ideal_constraint_name) <= 63:
-                    fk_constraint_name_unquoted = ideal_constraint_name
-                else:
-                    hash_suffix = hashlib.md5(
-                        ideal_constraint_name.encode()
-                    ).hexdigest()[:6]
-                    prefix = "fk_"
-                    len_prefix = len(prefix)
-                    len_hash = len(hash_suffix)
-                    len_separator_before_hash = 1  # for the _ before the hash
-
-                    # Max length for the combined "childpart_parentpart" string
-                    max_len_for_tables_part = (
-                        63 - len_prefix - len_hash - len_separator_before_hash
-                    )
-
-                    child_part = child_table_raw
-                    parent_part = parent_table_raw_sanitized
-
-                    # Available length for "childpart_parentpart" (child + parent + 1 underscore)
-                    available_for_names_plus_underscore = max_len_for_tables_part
-
-                    # If current combined length (child + _ + parent) is too long
-                    if (
-                        len(child_part) + 1 + len(parent_part)
-                    ) > available_for_names_plus_underscore:
-                        # Max length for each name part, aiming for roughly equal truncation
-                        # -1 for the underscore separating child and parent parts
-                        available_for_child_and_parent_only = (
-                            available_for_names_plus_underscore - 1
-                        )
+                fk_constraint_name_quoted = f'"{fk_constraint_name_unquoted}"'
 
-                        # Attempt to allocate space, giving more to longer names if possible,
-                        # but simple equal split first.
-                        max_len_child_part = available_for_child_and_parent_only // 2
-                        max_len_parent_part = (
-                            available_for_child_and_parent_only - max_len_child_part
+                if (
+                    child_table_name_lowercase,
+                    fk_constraint_name_unquoted,
+                ) in existing_constraints:
+                    if "--verbose" in sys.argv:
+                        print(
+                            f"Warning: FK constraint {fk_constraint_name_quoted} on table {child_table_name_lowercase} already exists. Skipping creation."
                         )
+                    continue
 
-                        if len(child_part) > max_len_child_part:
-                            child_part = child_part[:max_len_child_part]
-                            # Recalculate max_len_parent_part based on actual truncated child_part length
-                            max_len_parent_part = (
-                                available_for_child_and_parent_only - len(child_part)
-                            )
-
-                        if len(parent_part) > max_len_parent_part:
-                            parent_part = parent_part[:max_len_parent_part]
-
-                        # Final check if parent_part truncation made child_part too long again (if parent was very short initially)
-                        if (
-                            len(child_part) + 1 + len(parent_part)
-                        ) > available_for_names_plus_underscore:
-                            child_part = child_part[
-                                : available_for_child_and_parent_only
-                                - len(parent_part)
-                                - 1
-                            ]
-
-                    fk_constraint_name_unquoted = (
-                        f"{prefix}{child_part}_{parent_part}_{hash_suffix}"
+                # A table created by this file holds only this file's rows, so validating the FK
+                # right away is cheap and rejects the file if its own rows break it. An older table
+                # skips the scan with NOT VALID; this file's rows in it can only break the FK if
+                # some of them hang under a different parent table, which is known here already.
+                validate_now = child_table_name_lowercase in created_tables
+                if (
+                    not validate_now
+                    and len(file_parent_tables[child_table_name_lowercase]) > 1
+                ):
+                    print(
+                        f"Critical Error: rows of table {child_table_name_lowercase} in this file have parents in "
+                        f"{sorted(file_parent_tables[child_table_name_lowercase])}; FK {fk_constraint_name_quoted} "
+                        f"referencing {parent_table_name_lowercase} would be violated."
                     )
-
-                    # Absolute final truncation if logic somehow failed (should be rare)
-                    if len(fk_constraint_name_unquoted) > 63:
-                        fk_constraint_name_unquoted = fk_constraint_name_unquoted[:63]
-
-                fk_constraint_name_quoted = f'"{fk_constraint_name_unquoted}"'
-
+                    raise psycopg2.Error(
+                        f"Foreign key {fk_constraint_name_unquoted} would be violated by rows of {xml_file_path}"
+                    )  # Trigger rollback
+
+                not_valid_sql = "" if validate_now else " NOT VALID"
+                alter_sql = f"""
+                    ALTER TABLE "{PG_SCHEMA}"."{child_table_name_lowercase}"
+                    ADD CONSTRAINT {fk_constraint_name_quoted}
+                    FOREIGN KEY ("parent_element_id")
+                    REFERENCES "{PG_SCHEMA}"."{parent_table_name_lowercase}" ("element_id")
+                    ON DELETE CASCADE{not_valid_sql};
+                """
                 try:
-                    # Check if constraint already exists
-                    check_fk_sql = (
-                        "SELECT constraint_name "
-                        "FROM information_schema.table_constraints "
-                        "WHERE table_schema = %s "
-                        "  AND table_name = %s "
-                        "  AND constraint_name = %s;"
+                    print(f"Attempting to execute FK DDL: {alter_sql.strip()}")
+                    cursor.execute(alter_sql)
+                    existing_constraints.add(
+                        (child_table_name_lowercase, fk_constraint_name_unquoted)
                     )
-                    cursor.execute(
-                        check_fk_sql,
-                        (
-                            PG_SCHEMA,
-                            child_table_name_lowercase,
-                            fk_constraint_name_unquoted,
-                        ),
+                    print(
+                        f"Successfully created FK: {fk_constraint_name_quoted} on table {child_table_name_lowercase} referencing {parent_table_name_lowercase}"
                     )
-                    existing_fk = cursor.fetchone()
-
-                    if existing_fk is None:
-                        # Define alter_sql only if we need to create the constraint
-                        alter_sql = f"""
-                            ALTER TABLE "{PG_SCHEMA}"."{child_table_name_lowercase}"
-                            ADD CONSTRAINT {fk_constraint_name_quoted}
-                            FOREIGN KEY ("parent_element_id")
-                            REFERENCES "{PG_SCHEMA}"."{parent_table_name_lowercase}" ("element_id")
-                            ON DELETE CASCADE;
-                        """
-                        print(f"Attempting to execute FK DDL: {alter_sql.strip()}")
-                        cursor.execute(alter_sql)
-                        print(
-                            f"Successfully created FK: {fk_constraint_name_quoted} on table {child_table_name_lowercase} referencing {parent_table_name_lowercase}"
+                    if not validate_now:
+                        new_fk_validations.append(
+                            f'ALTER TABLE "{PG_SCHEMA}"."{child_table_name_lowercase}" VALIDATE CONSTRAINT {fk_constraint_name_quoted};'
                         )
-                    else:
-                        if "--verbose" in sys.argv:
-                            print(
-                                f"Warning: FK constraint {fk_constraint_name_quoted} on table {child_table_name_lowercase} already exists according to information_schema. Skipping creation."
-                            )
-
                 except psycopg2.Error as e:
-                    # Catch errors from either the SELECT or the ALTER TABLE
-                    # If alter_sql was defined, include it in the error message
-                    current_sql_attempt = "N/A"
-                    if (
-                        "alter_sql" in locals() and existing_fk is None
-                    ):  # only if ALTER was attempted
-                        current_sql_attempt = alter_sql.strip()
-                    elif "check_fk_sql" in locals():  # if error was in the check
-                        current_sql_attempt = check_fk_sql.strip()
-
                     print(
                         f"Critical Error during FK operation for constraint {fk_constraint_name_quoted} on table {child_table_name_lowercase}."
                     )
-                    print(f"Attempted SQL (or check query): {current_sql_attempt}")
+                    print(f"Attempted SQL: {alter_sql.strip()}")
                     print(f"Error Details: {e}")
                     raise  # Re-raise to trigger transaction rollback for the file
             print("Foreign key constraint creation phase completed.")
+            if new_fk_validations:
+                print(
+                    f"{len(new_fk_validations)} new FK(s) were created NOT VALID; they are enforced for new rows. "
+                    "To check existing rows later, run:"
+                )
+                for validate_sql in new_fk_validations:
+                    print(f"  {validate_sql}")
 
-        db_conn.commit()  # Commit transaction if all elements and FKs processed successfully
-        print(
-            f"All elements and FKs from {xml_file_path} successfully ingested and committed."
-        )
+        # Record success in the same transaction so the data and its log row commit together
         log_processed_file(
             db_conn,
             processed_file_id,
@@ -652,14 +857,38 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
             md5_hash,
             "Staged_Dynamic_PG_V4",
             ingestion_schema_id,
+            commit=False,
+            timestamp=processing_timestamp,
+        )
+        db_conn.commit()  # Commit transaction if all elements and FKs processed successfully
+        print(
+            f"All elements and FKs from {xml_file_path} successfully ingested and committed."
         )
 
         if not archive_file(xml_file_path, ARCHIVE_DIR):
             print(f"Warning: Data staged for {xml_file_path}, but failed to archive.")
         return True
 
+    except ET.ParseError as e:
+        db_conn.rollback()
+        _table_column_cache.clear()  # Drop tables/columns whose DDL was just rolled back
+        print(
+            f"Error parsing XML file {xml_file_path}: {e}. Rolled back any staged data."
+        )
+        log_processed_file(
+            db_conn,
+            processed_file_id,
+            original_file_name,
+            md5_hash,
+            "Error_Parsing_Empty",
+            ingestion_schema_id,
+            timestamp=processing_timestamp,
+        )
+        move_to_error_directory(xml_file_path)
+        return False
     except psycopg2.Error as e:
         db_conn.rollback()
+        _table_column_cache.clear()  # Drop tables/columns whose DDL was just rolled back
         print(f"DB Tx error (PG) for {xml_file_path}: {e}. Rolled back.")
         log_processed_file(
             db_conn,
@@ -668,11 +897,13 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
             md5_hash,
             "Error_Staging_Tx_PG_V4",
             ingestion_schema_id,
+            timestamp=processing_timestamp,
         )
         move_to_error_directory(xml_file_path)
         return False
     except Exception as e:
         db_conn.rollback()
+        _table_column_cache.clear()  # Drop tables/columns whose DDL was just rolled back
         print(
             f"Unexpected critical error processing {xml_file_path}: {e}. Rolled back."
         )
@@ -683,11 +914,36 @@ def process_xml_file(db_conn, xml_file_path, ingestion_schema_id):
             md5_hash,
             "Error_Unexpected_PG_V4",
             ingestion_schema_id,
+            timestamp=processing_timestamp,
         )
         move_to_error_directory(xml_file_path)
         return False
-    finally:
-        _table_column_cache.clear()  # Clear cache after processing each file
+
+
+def collect_xml_files(paths):
+    """
+    Expand command-line paths into the list of XML files to ingest.
+
+    Files are taken as given; a directory contributes its *.xml files (not recursive), sorted by
+    name. Duplicates are dropped while keeping the first occurrence's order.
+    """
+    xml_files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = sorted(
+                os.path.join(path, name)
+                for name in os.listdir(path)
+                if name.lower().endswith(".xml")
+                and os.path.isfile(os.path.join(path, name))
+            )
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            if candidate not in seen:
+                seen.add(candidate)
+                xml_files.append(candidate)
+    return xml_files
 
 
 def main():
@@ -695,7 +951,11 @@ def main():
     parser = argparse.ArgumentParser(
         description="NEMSIS XML Dynamic Data Ingestion Tool V4 (PostgreSQL)"
     )
-    parser.add_argument("xml_file", help="Path to the NEMSIS XML file to process.")
+    parser.add_argument(
+        "xml_paths",
+        nargs="+",
+        help="NEMSIS XML file(s) to process, or directories whose *.xml files are processed.",
+    )
     parser.add_argument(
         "--archive-dir",
         default=ARCHIVE_DIR,
@@ -741,12 +1001,27 @@ def main():
             f"Using IngestionSchemaID: {ingestion_schema_id} for Version: {target_ingestion_logic_version}"
         )
 
-        success = process_xml_file(conn, args.xml_file, ingestion_schema_id)
+        xml_files = collect_xml_files(args.xml_paths)
+        if not xml_files:
+            print(f"No XML files found in: {', '.join(args.xml_paths)}")
+            return
+
+        # One connection and one schema cache serve every file. Each file is hashed by
+        # process_xml_file just before it is parsed, while its pages are still cached
+        failed_files = []
+        for xml_file in xml_files:
+            success = process_xml_file(conn, xml_file, ingestion_schema_id)
 
-        if success:
-            print(f"--- Ingestion for {args.xml_file} completed successfully. ---")
-        else:
-            print(f"--- Ingestion for {args.xml_file} failed. See logs. ---")
+            if success:
+                print(f"--- Ingestion for {xml_file} completed successfully. ---")
+            else:
+                print(f"--- Ingestion for {xml_file} failed. See logs. ---")
+                failed_files.append(xml_file)
+
+        if len(xml_files) > 1:
+            print(
+                f"--- Processed {len(xml_files)} files: {len(xml_files) - len(failed_files)} succeeded, {len(failed_files)} failed. ---"
+            )
 
     except psycopg2.Error as e:
         print(f"Critical PostgreSQL error in main: {e}")
@@ -754,7 +1029,8 @@ def main():
         print(f"Critical error in main: {e}")
     finally:
         if conn:
-            conn.close()
+            release_db_connection(conn)
+        close_db_pool()
         print("Database connection closed.")
 
 
@@ -1,6 +1,6 @@
 import argparse
 import pandas as pd
-from database_setup import get_db_connection
+from database_setup import get_db_connection, release_db_connection, close_db_pool
 import os
 
 VENDOR_SPECS = {
@@ -241,10 +241,13 @@ def import_vendor_excel(file_path, vendor, source):
                 cur.execute(insert_sql, values)
         conn.commit()
         print(f"[INFO] Inserted {len(df)} rows into {table_name}")
-    conn.close()
+    release_db_connection(conn)
     print("[INFO] Import complete.")
 
 
 if __name__ == "__main__":
     args = parse_args()
-    import_vendor_excel(args.file_path, args.vendor, args.source)
+    try:
+        import_vendor_excel(args.file_path, args.vendor, args.source)
+    finally:
+        close_db_pool()
@@ -1,4 +1,7 @@
 import xml.etree.ElementTree as ET
+import functools
+import os
+import re
 import uuid
 
 # NEMSIS specific namespaces (if any, often they are not explicitly namespaced in files)
@@ -7,30 +10,43 @@ import uuid
 # For the provided example, it seems like direct tag names are used without explicit namespace prefixes in find calls.
 
 
+# Read buffer for the XML stream; large sequential reads instead of the 8 KiB default
+XML_READ_BUFFER_SIZE = 1 << 20
+
+# Anything that is not alphanumeric or an underscore (\w matches the same Unicode set as str.isalnum() plus "_")
+_UNSAFE_NAME_CHARS_RE = re.compile(r"[^\w]")
+
+
+@functools.lru_cache(maxsize=None)  # Tag/attribute vocabularies are small and bounded
 def _sanitize_name(name):
     """Converts a name to be SQL-friendly. Replaces . with _ and removes other non-alphanumeric chars."""
     # Replace . with _ first, then remove other problematic characters
     name = name.replace(".", "_")
     # Keep only alphanumeric and underscores
-    name = "".join(char for char in name if char.isalnum() or char == "_")
+    name = _UNSAFE_NAME_CHARS_RE.sub("", name)
     # Ensure it doesn't start with a number (common SQL restriction)
     if name and name[0].isdigit():
         name = "_" + name
     return name if name else "unnamed_element"
 
 
-def _traverse_element_recursive(
-    element,
-    parent_element_id,
-    current_pcr_uuid,
-    element_path_parts,
-    processed_elements,
-    parent_table_suggestion_for_child,
-):
+def _local_name(raw_name):
+    """Strips a namespace URI if present (e.g., {http://www.nemsis.org}TagName -> TagName)."""
+    if "}" in raw_name and raw_name.startswith("{"):
+        return raw_name.split("}", 1)[1]
+    return raw_name
+
+
+def iter_xml_elements(file_path):
     """
-    Recursively traverse an XML element tree, collect contextual metadata for each element, and append a structured record to `processed_elements`.
+    Stream every element of an XML file with its contextual metadata, one dictionary at a time.
     
-    Each visited element produces a dictionary appended to `processed_elements` containing:
+    Uses ElementTree.iterparse so the document is never held in memory as a whole. Elements are
+    yielded in document (pre-order) order, parents before their children, as soon as their text is
+    known (when their first child starts, or at their end tag for leaves); each element is cleared
+    and detached from its parent once its end tag has been read. The file is read through a XML_READ_BUFFER_SIZE buffer with a
+    sequential-access hint, and its cached pages are released once parsing stops. Each yielded
+    dictionary contains:
     - element_id: UUID string unique to this element instance.
     - parent_element_id: element_id of the parent or None for the root.
     - element_tag: local tag name with any namespace URI removed.
@@ -43,81 +59,106 @@ def _traverse_element_recursive(
     - parent_table_suggestion: the table_suggestion value of this element's parent.
     
     Parameters:
-    - element: xml.etree.ElementTree.Element to process.
-    - parent_element_id: string UUID of the parent element or None for the root.
-    - current_pcr_uuid: PCR UUID (string) propagated from ancestor PatientCareReport elements; may be updated if this element is a PatientCareReport with a UUID attribute.
-    - element_path_parts: list of sanitized tag names representing the path from the root to this element.
-    - processed_elements: list to which this function appends the element metadata dictionaries (side effect).
-    - parent_table_suggestion_for_child: table suggestion (sanitized tag) of this element's parent; recorded for children.
+    - file_path: Path to the XML file.
     
-    Side effects:
-    - Appends a metadata dictionary for each visited element to `processed_elements` and recursively processes all child elements.
+    Raises:
+    - ET.ParseError: If the XML is malformed (possibly after some elements were already yielded).
+    - FileNotFoundError: If the file does not exist.
     """
-    element_id = str(uuid.uuid4())  # Unique ID for this element instance
-
-    raw_tag = element.tag
-    local_tag_name = raw_tag
-    # Strip namespace URI if present (e.g., {http://www.nemsis.org}TagName -> TagName)
-    if "}" in raw_tag and raw_tag.startswith("{"):
-        local_tag_name = raw_tag.split("}", 1)[1]
-
-    sanitized_local_tag = _sanitize_name(local_tag_name)
-
-    # table_suggestion will be based on the sanitized local tag name
-    table_suggestion = sanitized_local_tag
-    current_path_parts = element_path_parts + [
-        sanitized_local_tag
-    ]  # Path uses sanitized local names
-    element_path_str = "/".join(current_path_parts)
+    with open(file_path, "rb", buffering=XML_READ_BUFFER_SIZE) as xml_file:
+        if hasattr(os, "posix_fadvise"):  # Linux/BSD only; a read-ahead hint, safe to skip
+            os.posix_fadvise(xml_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            yield from _iterparse_elements(xml_file)
+        finally:
+            if hasattr(os, "posix_fadvise"):
+                # The file is read once per ingest; don't let it crowd the page cache
+                os.posix_fadvise(xml_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _element_record(open_element, parent_open_element):
+    """Builds the yielded dictionary for an open element from its stack entry and its parent's."""
+    element, element_id, table_suggestion, current_pcr_uuid, _ = open_element
+    parent_element_id, parent_table_suggestion = (
+        (parent_open_element[1], parent_open_element[2])
+        if parent_open_element
+        else (None, None)
+    )
 
     # Sanitize attribute keys as well, stripping namespaces if they are present in {uri}key format
-    attributes = {}
-    for k_raw, v in element.attrib.items():
-        k_local = k_raw
-        if "}" in k_raw and k_raw.startswith("{"):
-            k_local = k_raw.split("}", 1)[1]
-        attributes[_sanitize_name(k_local)] = v
-
-    # Capture the PatientCareReport UUID if this element is it or is a child of it
-    # Use local_tag_name for comparison here, assuming NEMSIS tags won't be namespaced differently
+    attributes = {
+        _sanitize_name(_local_name(k_raw)): v for k_raw, v in element.attrib.items()
+    }
+    local_tag_name = _local_name(element.tag)
     if local_tag_name == "PatientCareReport" and element.get("UUID"):
-        current_pcr_uuid = element.get("UUID")
         # Add the PCR UUID as an attribute of the PatientCareReport element itself if not already there
         # and if the sanitized key "UUID" doesn't exist (it might if UUID was an explicit attribute)
         if _sanitize_name("UUID") not in attributes:
             attributes[_sanitize_name("UUID")] = current_pcr_uuid
 
-    # Generate dynamic column name for text content based on sanitized element tag
-    value_column_name = f"{sanitized_local_tag}_value"
-
-    element_data = {
+    return {
         "element_id": element_id,
         "parent_element_id": parent_element_id,
         "element_tag": local_tag_name,  # Store the local tag name (without namespace)
-        "full_xmlns_tag": raw_tag,  # Store the original tag with xmlns if needed later for any reason
+        "full_xmlns_tag": element.tag,  # Store the original tag with xmlns if needed later for any reason
         "table_suggestion": table_suggestion,  # Based on sanitized local tag
         "attributes": attributes,  # Attributes are also sanitized (keys)
         "text_content": element.text.strip() if element.text else None,
-        "value_column_name": value_column_name,  # Dynamic column name for the text content
+        "value_column_name": f"{table_suggestion}_value",  # Dynamic column name for the text content
         "pcr_uuid_context": current_pcr_uuid,
-        "parent_table_suggestion": parent_table_suggestion_for_child,
+        "parent_table_suggestion": parent_table_suggestion,
     }
-    processed_elements.append(element_data)
-
-    for child in element:
-        _traverse_element_recursive(
-            child,
-            element_id,
-            current_pcr_uuid,
-            current_path_parts,
-            processed_elements,
-            element_data["table_suggestion"],
-        )
+
+
+def _iterparse_elements(xml_file):
+    """Body of iter_xml_elements(): turns iterparse start/end events on an open file into element records."""
+    # [element, element_id, table_suggestion, pcr_uuid_context, emitted] for each currently open element
+    open_elements = []
+
+    for event, element in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            parent = open_elements[-1] if open_elements else None
+            if parent and not parent[4]:
+                # The parent's text is complete once its first child starts; emit it before any child
+                yield _element_record(
+                    parent, open_elements[-2] if len(open_elements) > 1 else None
+                )
+                parent[4] = True
+
+            # Capture the PatientCareReport UUID if this element is it or is a child of it
+            # Use local_tag_name for comparison here, assuming NEMSIS tags won't be namespaced differently
+            current_pcr_uuid = parent[3] if parent else None
+            if _local_name(element.tag) == "PatientCareReport" and element.get("UUID"):
+                current_pcr_uuid = element.get("UUID")
+            open_elements.append(
+                [
+                    element,
+                    str(uuid.uuid4()),  # Unique ID for this element instance
+                    _sanitize_name(_local_name(element.tag)),
+                    current_pcr_uuid,
+                    False,
+                ]
+            )
+            continue
+
+        open_element = open_elements.pop()
+        parent = open_elements[-1] if open_elements else None
+        if not open_element[4]:  # Leaf element: emitted at its end tag
+            yield _element_record(open_element, parent)
+
+        # Everything about this element has been emitted; free it and detach it from its parent
+        # (earlier siblings are already detached, so the parent never accumulates children)
+        element.clear()
+        if parent:
+            parent[0].remove(element)
 
 
 def parse_xml_file(file_path):
     """Parses XML and returns all elements with their contextual data.
 
+    Materializing wrapper around iter_xml_elements(); prefer the generator for large files.
+    Elements are listed in document order, each parent before its children.
+
     Args:
         file_path: Path to the XML file.
 
@@ -125,10 +166,8 @@ def parse_xml_file(file_path):
         A list of dictionaries, where each dictionary represents an XML element.
         Returns an empty list if parsing fails or file not found.
     """
-    processed_elements = []
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
+        return list(iter_xml_elements(file_path))
     except ET.ParseError as e:
         print(f"Error parsing XML file {file_path}: {e}")
         return []
@@ -136,10 +175,6 @@ def parse_xml_file(file_path):
         print(f"Error: XML file not found at {file_path}")
         return []
 
-    _traverse_element_recursive(root, None, None, [], processed_elements, None)
-
-    return processed_elements
-
     print("Testing xml_handler.py with full traversal...")
     example_file = "nemsis_xml/NEMSIS_EMS__3_5_0__20250215_121500.xml"
 